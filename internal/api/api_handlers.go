@@ -1,6 +1,8 @@
 package api
 
 import (
+	"crypto/sha256"
+	"encoding/hex"
 	"encoding/json"
 	"errors"
 	"fmt"
@@ -26,6 +28,29 @@ func jsonResponse(w http.ResponseWriter, data any) {
 	json.NewEncoder(w).Encode(data)
 }
 
+// jsonResponseWithETag writes data as JSON tagged with a hash of its body,
+// replying 304 Not Modified when the client already holds the same body.
+func jsonResponseWithETag(w http.ResponseWriter, r *http.Request, data any) {
+	body, err := json.Marshal(data)
+	if err != nil {
+		jsonError(w, err.Error(), http.StatusInternalServerError)
+		return
+	}
+
+	sum := sha256.Sum256(body)
+	etag := `"` + hex.EncodeToString(sum[:16]) + `"`
+	w.Header().Set("ETag", etag)
+	w.Header().Set("Cache-Control", "no-cache")
+
+	if r.Header.Get("If-None-Match") == etag {
+		w.WriteHeader(http.StatusNotModified)
+		return
+	}
+
+	w.Header().Set("Content-Type", "application/json")
+	w.Write(append(body, '\n'))
+}
+
 func jsonError(w http.ResponseWriter, message string, status int) {
 	w.Header().Set("Content-Type", "application/json")
 	w.WriteHeader(status)
@@ -140,7 +165,7 @@ func (s *Server) handleAPIGetFeeds(w http.ResponseWriter, r *http.Request) {
 		jsonError(w, err.Error(), http.StatusInternalServerError)
 		return
 	}
-	jsonResponse(w, feeds)
+	jsonResponseWithETag(w, r, feeds)
 }
 
 func (s *Server) handleAPICreateFeed(w http.ResponseWriter, r *http.Request) {
@@ -168,6 +193,33 @@ func (s *Server) handleAPICreateFeed(w http.ResponseWriter, r *http.Request) {
 	jsonResponse(w, feed)
 }
 
+// settleShortsStatus checks shorts status for videos with null is_short,
+// saving the results. Returns how many turned out to be shorts.
+func (s *Server) settleShortsStatus(videos []models.Video) int {
+	var uncheckedIDs []string
+	for _, v := range videos {
+		if v.IsShort == nil {
+			uncheckedIDs = append(uncheckedIDs, v.ID)
+		}
+	}
+	if len(uncheckedIDs) == 0 {
+		return 0
+	}
+
+	newShorts := 0
+	shortsStatus := yt.CheckShortsStatus(uncheckedIDs)
+	for i := range videos {
+		if isShort, ok := shortsStatus[videos[i].ID]; ok {
+			videos[i].IsShort = &isShort
+			s.db.UpdateVideoIsShort(videos[i].ID, isShort)
+			if isShort {
+				newShorts++
+			}
+		}
+	}
+	return newShorts
+}
+
 func (s *Server) handleAPIGetFeed(w http.ResponseWriter, r *http.Request) {
 	id, err := strconv.ParseInt(r.PathValue("id"), 10, 64)
 	if err != nil {
@@ -201,27 +253,35 @@ func (s *Server) handleAPIGetFeed(w http.ResponseWriter, r *http.Request) {
 		}
 	}
 
-	videos, total, err := s.db.GetVideosByFeed(id, limit, offset)
-	if err != nil {
-		jsonError(w, err.Error(), http.StatusInternalServerError)
-		return
-	}
+	excludeShorts := r.URL.Query().Get("exclude_shorts") == "true"
 
-	// Check shorts status for any videos with null is_short
-	var uncheckedIDs []string
-	for _, v := range videos {
-		if v.IsShort == nil {
-			uncheckedIDs = append(uncheckedIDs, v.ID)
+	// With exclude_shorts, shorts found while settling unknown videos change the
+	// filtered set, so re-query until the page is stable. Otherwise the next
+	// page's offset would skip past videos that moved up into this one.
+	var videos []models.Video
+	var total int
+	for attempt := 0; ; attempt++ {
+		videos, total, err = s.db.GetVideosByFeed(id, limit, offset, excludeShorts)
+		if err != nil {
+			jsonError(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+
+		newShorts := s.settleShortsStatus(videos)
+		if !excludeShorts || newShorts == 0 || attempt == 2 {
+			break
 		}
 	}
-	if len(uncheckedIDs) > 0 {
-		shortsStatus := yt.CheckShortsStatus(uncheckedIDs)
-		for i := range videos {
-			if isShort, ok := shortsStatus[videos[i].ID]; ok {
-				videos[i].IsShort = &isShort
-				s.db.UpdateVideoIsShort(videos[i].ID, isShort)
+
+	// Drop any shorts still left after the last re-query
+	if excludeShorts {
+		filtered := videos[:0]
+		for _, v := range videos {
+			if v.IsShort == nil || !*v.IsShort {
+				filtered = append(filtered, v)
 			}
 		}
+		videos = filtered
 	}
 
 	// Get watch progress for videos
@@ -234,7 +294,7 @@ func (s *Server) handleAPIGetFeed(w http.ResponseWriter, r *http.Request) {
 	// Get all feeds for move dialog
 	allFeeds, _ := s.db.GetFeeds()
 
-	jsonResponse(w, map[string]any{
+	jsonResponseWithETag(w, r, map[string]any{
 		"feed":        feed,
 		"channels":    channels,
 		"videos":      videos,
@@ -923,7 +983,7 @@ func (s *Server) handleAPIGetHistory(w http.ResponseWriter, r *http.Request) {
 	}
 	progressMap, _ := s.db.GetWatchProgressMap(videoIDs)
 
-	jsonResponse(w, map[string]any{
+	jsonResponseWithETag(w, r, map[string]any{
 		"videos":      videos,
 		"progressMap": progressMap,
 	})
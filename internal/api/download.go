@@ -200,7 +200,9 @@ func (dm *DownloadManager) Subscribe(videoID string) chan DownloadProgress {
 	return ch
 }
 
-// Unsubscribe removes a progress listener
+// Unsubscribe removes a progress listener.
+// The channel is not closed: broadcast sends to a snapshot of the listeners
+// outside the lock, and a send on a closed channel would panic.
 func (dm *DownloadManager) Unsubscribe(videoID string, ch chan DownloadProgress) {
 	dm.mu.Lock()
 	defer dm.mu.Unlock()
@@ -208,8 +210,15 @@ func (dm *DownloadManager) Unsubscribe(videoID string, ch chan DownloadProgress)
 	listeners := dm.listeners[videoID]
 	for i, listener := range listeners {
 		if listener == ch {
-			dm.listeners[videoID] = append(listeners[:i], listeners[i+1:]...)
-			close(ch)
+			// Build a new slice so snapshots held by broadcast stay intact
+			remaining := make([]chan DownloadProgress, 0, len(listeners)-1)
+			remaining = append(remaining, listeners[:i]...)
+			remaining = append(remaining, listeners[i+1:]...)
+			if len(remaining) == 0 {
+				delete(dm.listeners, videoID)
+			} else {
+				dm.listeners[videoID] = remaining
+			}
 			break
 		}
 	}
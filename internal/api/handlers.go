@@ -136,7 +136,9 @@ func (s *Server) RegisterRoutes(mux *http.ServeMux) {
 
 	mux.HandleFunc("POST /api/videos/{id}/download", s.handleStartDownload)
 	mux.HandleFunc("GET /api/videos/{id}/download/status", s.handleDownloadStatus)
+	mux.HandleFunc("GET /api/videos/{id}/download/wait", s.handleDownloadWait)
 	mux.HandleFunc("GET /api/videos/{id}/qualities", s.handleGetQualities)
+	mux.HandleFunc("POST /api/videos/{id}/resolve-quality", s.handleResolveQuality)
 
 	mux.HandleFunc("POST /api/import/url", s.handleAPIImportURL)
 	mux.HandleFunc("POST /api/import/file", s.handleAPIImportFile)
@@ -481,7 +483,7 @@ func (s *Server) handleFeedPage(w http.ResponseWriter, r *http.Request) {
 		return
 	}
 
-	videos, _, err := s.db.GetVideosByFeed(feedID, 50, 0)
+	videos, _, err := s.db.GetVideosByFeed(feedID, 50, 0, false)
 	if err != nil {
 		http.Error(w, err.Error(), http.StatusInternalServerError)
 		return
@@ -1808,12 +1810,67 @@ func (s *Server) handleDownloadStatus(w http.ResponseWriter, r *http.Request) {
 	}
 }
 
+// handleDownloadWait long-polls until a quality is cached or the timeout elapses.
+// Lets clients without SSE support (e.g. Kodi) wait for a download without polling.
+func (s *Server) handleDownloadWait(w http.ResponseWriter, r *http.Request) {
+	videoID := r.PathValue("id")
+	quality := r.URL.Query().Get("quality")
+	if quality == "" {
+		jsonError(w, "Quality must be specified", http.StatusBadRequest)
+		return
+	}
+
+	timeout := 30 * time.Second
+	if t := r.URL.Query().Get("timeout"); t != "" {
+		if parsed, err := strconv.Atoi(t); err == nil && parsed > 0 && parsed <= 60 {
+			timeout = time.Duration(parsed) * time.Second
+		}
+	}
+
+	// Subscribe before checking the cache so a completion in between isn't missed
+	ch := s.downloadManager.Subscribe(videoID)
+	defer s.downloadManager.Unsubscribe(videoID, ch)
+
+	cacheKey := CacheKey(videoID, quality)
+	if _, ok := s.videoCache.Get(cacheKey); ok {
+		jsonResponse(w, map[string]any{"cached": true})
+		return
+	}
+
+	ctx, cancel := context.WithTimeout(r.Context(), timeout)
+	defer cancel()
+
+	for {
+		select {
+		case <-ctx.Done():
+			jsonResponse(w, map[string]any{"cached": false})
+			return
+		case progress := <-ch:
+			if progress.Quality != quality {
+				continue
+			}
+			if progress.Status == "error" {
+				jsonError(w, progress.Error, http.StatusInternalServerError)
+				return
+			}
+			if progress.Status == "complete" {
+				_, cached := s.videoCache.Get(cacheKey)
+				jsonResponse(w, map[string]any{"cached": cached})
+				return
+			}
+		}
+	}
+}
+
+// availableQualities lists the qualities offered for every video, lowest first
+// (hardcoded for now, could query yt-dlp)
+var availableQualities = []string{"360", "480", "720", "1080", "1440", "2160"}
+
 // handleGetQualities returns available, cached, and downloading qualities for a video
 func (s *Server) handleGetQualities(w http.ResponseWriter, r *http.Request) {
 	videoID := r.PathValue("id")
 
-	// Available qualities (hardcoded for now, could query yt-dlp)
-	available := []string{"360", "480", "720", "1080", "1440", "2160"}
+	available := availableQualities
 
 	// Check which are cached
 	var cached []string
@@ -1840,3 +1897,44 @@ func (s *Server) handleGetQualities(w http.ResponseWriter, r *http.Request) {
 		"downloading": downloading,
 	})
 }
+
+// handleResolveQuality picks the available quality nearest to the preferred one
+// and reports whether it is cached, saving clients a qualities round-trip
+func (s *Server) handleResolveQuality(w http.ResponseWriter, r *http.Request) {
+	videoID := r.PathValue("id")
+
+	var req struct {
+		Preferred string `json:"preferred"`
+	}
+	if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+		http.Error(w, "Invalid request body", http.StatusBadRequest)
+		return
+	}
+
+	preferred, err := strconv.Atoi(strings.TrimSuffix(req.Preferred, "p"))
+	if err != nil {
+		http.Error(w, "Preferred quality must be numeric (e.g., 720, 1080)", http.StatusBadRequest)
+		return
+	}
+
+	selected := availableQualities[0]
+	bestDiff := -1
+	for _, q := range availableQualities {
+		height, _ := strconv.Atoi(q)
+		diff := height - preferred
+		if diff < 0 {
+			diff = -diff
+		}
+		if bestDiff < 0 || diff < bestDiff {
+			selected = q
+			bestDiff = diff
+		}
+	}
+
+	_, cached := s.videoCache.Get(CacheKey(videoID, selected))
+
+	json.NewEncoder(w).Encode(map[string]interface{}{
+		"selected": selected,
+		"cached":   cached,
+	})
+}
@@ -522,29 +522,36 @@ func (db *DB) UpsertVideo(v *models.Video) (bool, error) {
 	return isInsert, err
 }
 
-func (db *DB) GetVideosByFeed(feedID int64, limit, offset int) ([]models.Video, int, error) {
+// GetVideosByFeed returns a page of a feed's videos, newest first.
+// With excludeShorts, videos known to be shorts are left out of both the page and the total.
+func (db *DB) GetVideosByFeed(feedID int64, limit, offset int, excludeShorts bool) ([]models.Video, int, error) {
+	shortsFilter := ""
+	if excludeShorts {
+		shortsFilter = "AND (v.is_short IS NULL OR v.is_short = 0)"
+	}
+
 	// Get total count first
 	var total int
-	err := db.conn.QueryRow(`
+	err := db.conn.QueryRow(fmt.Sprintf(`
 		SELECT COUNT(*)
 		FROM videos v
 		JOIN channels c ON v.channel_id = c.id
 		JOIN feed_channels fc ON c.id = fc.channel_id
-		WHERE fc.feed_id = ?
-	`, feedID).Scan(&total)
+		WHERE fc.feed_id = ? %s
+	`, shortsFilter), feedID).Scan(&total)
 	if err != nil {
 		return nil, 0, err
 	}
 
-	rows, err := db.conn.Query(`
+	rows, err := db.conn.Query(fmt.Sprintf(`
 		SELECT v.id, v.channel_id, v.title, v.channel_name, v.thumbnail, v.duration, v.is_short, v.published, v.url
 		FROM videos v
 		JOIN channels c ON v.channel_id = c.id
 		JOIN feed_channels fc ON c.id = fc.channel_id
-		WHERE fc.feed_id = ?
+		WHERE fc.feed_id = ? %s
 		ORDER BY v.published DESC
 		LIMIT ? OFFSET ?
-	`, feedID, limit, offset)
+	`, shortsFilter), feedID, limit, offset)
 	if err != nil {
 		return nil, 0, err
 	}
@@ -2,7 +2,10 @@
 """Feeds Kodi Plugin - Entry Point"""
 
 import sys
+import threading
+import time
 import urllib.parse
+from typing import Optional
 
 import xbmc
 import xbmcgui
@@ -15,14 +18,26 @@ ADDON = xbmcaddon.Addon()
 sys.path.insert(0, xbmcvfs.translatePath(ADDON.getAddonInfo("path") + "/resources/lib"))
 
 from feeds_api import FeedsAPI, FeedsAPIError
-from utils import format_duration, format_relative_date, build_plugin_url
+from utils import format_duration, format_relative_date, build_plugin_url, build_play_url_prefix, quote_param
 
 HANDLE = int(sys.argv[1])
 BASE_URL = sys.argv[0]
+CACHE_DIR = xbmcvfs.translatePath("special://temp/feeds_cache/")
+ETAG_DIR = xbmcvfs.translatePath("special://temp/feeds_etag/")
+PREFETCH_JOIN_TIMEOUT = 10  # seconds to let a next-page prefetch finish
+
+
+# Each plugin invocation is a fresh process, so these never go stale
+_API = None
+_SETTINGS = None
 
 
 def get_api() -> FeedsAPI:
     """Get configured API client."""
+    global _API
+    if _API is not None:
+        return _API
+
     server_url = ADDON.getSetting("server_url")
     if not server_url:
         xbmcgui.Dialog().ok("Feeds", "Please configure your server URL in addon settings.")
@@ -30,20 +45,26 @@ def get_api() -> FeedsAPI:
         server_url = ADDON.getSetting("server_url")
         if not server_url:
             raise FeedsAPIError("No server configured")
-    return FeedsAPI(server_url)
+    _API = FeedsAPI(server_url, cache_dir=CACHE_DIR, etag_dir=ETAG_DIR)
+    return _API
 
 
 def get_settings() -> dict:
     """Get addon settings."""
+    global _SETTINGS
+    if _SETTINGS is not None:
+        return _SETTINGS
+
     # Map enum index to quality value: 0=Ask, 1=720p, 2=1080p, 3=Best
     quality_map = {0: 0, 1: 720, 2: 1080, 3: 9999}
     quality_index = int(ADDON.getSetting("default_quality") or 0)
-    return {
+    _SETTINGS = {
         "server_url": ADDON.getSetting("server_url"),
         "default_quality": quality_map.get(quality_index, 0),
         "sponsorblock_enabled": ADDON.getSetting("sponsorblock_enabled") == "true",
         "videos_per_page": int(ADDON.getSetting("videos_per_page") or 50),
     }
+    return _SETTINGS
 
 
 def list_feeds():
@@ -58,6 +79,7 @@ def list_feeds():
     xbmcplugin.setPluginCategory(HANDLE, "Feeds")
     xbmcplugin.setContent(HANDLE, "files")
 
+    items = []
     for feed in feeds:
         feed_id = feed.get("id")
         name = feed.get("name", "Unknown")
@@ -66,74 +88,99 @@ def list_feeds():
         li.setInfo("video", {"title": name})
 
         url = build_plugin_url(BASE_URL, action="list_videos", feed_id=feed_id)
-        xbmcplugin.addDirectoryItem(HANDLE, url, li, isFolder=True)
+        items.append((url, li, True))
 
     # Add History
     li = xbmcgui.ListItem(label="[History]")
     li.setInfo("video", {"title": "History"})
     url = build_plugin_url(BASE_URL, action="history")
-    xbmcplugin.addDirectoryItem(HANDLE, url, li, isFolder=True)
+    items.append((url, li, True))
 
+    xbmcplugin.addDirectoryItems(HANDLE, items, totalItems=len(items))
     xbmcplugin.endOfDirectory(HANDLE)
 
 
-def list_videos(feed_id: int, offset: int = 0):
-    """Show videos in a feed."""
-    settings = get_settings()
-    limit = settings["videos_per_page"]
-
-    try:
-        api = get_api()
-        result = api.get_feed_videos(feed_id, limit=limit, offset=offset)
-    except FeedsAPIError as e:
-        xbmcgui.Dialog().ok("Feeds", f"Error: {e}")
-        return
-
-    feed_name = result.get("name", "Videos")
-    videos = result.get("videos", [])
-    total = result.get("total", 0)
-
-    xbmcplugin.setPluginCategory(HANDLE, feed_name)
+def render_video_list(category: str, videos: list, next_page_url: Optional[str],
+                      prefetch: Optional[threading.Thread] = None,
+                      skip_shorts: bool = False, show_dates: bool = False):
+    """Render a page of videos as playable items, with an optional next page."""
+    xbmcplugin.setPluginCategory(HANDLE, category)
     xbmcplugin.setContent(HANDLE, "videos")
 
+    items = []
+    play_base = build_play_url_prefix(BASE_URL)
     for video in videos:
-        # Skip shorts
-        if video.get("is_short"):
+        # Servers that ignore exclude_shorts still send shorts
+        if skip_shorts and video.get("is_short"):
             continue
 
         video_id = video.get("id")
         title = video.get("title", "Unknown")
-        channel = video.get("channel_name", "")
+        # Channel names repeat across a page; share one string object per channel
+        channel = sys.intern(video.get("channel_name") or "")
         thumbnail = video.get("thumbnail", "")
         duration = video.get("duration", 0)
-        published = video.get("published", "")
 
         # Format label with channel and date
-        date_str = format_relative_date(published)
-        label = f"{title}"
-        label2 = f"{channel} • {date_str}" if date_str else channel
+        if show_dates:
+            date_str = format_relative_date(video.get("published", ""))
+            label2 = f"{channel} • {date_str}" if date_str else channel
+            plot = f"{channel}\n{date_str}"
+        else:
+            label2 = channel
+            plot = channel
 
-        li = xbmcgui.ListItem(label=label, label2=label2)
+        li = xbmcgui.ListItem(label=title, label2=label2)
         li.setArt({"thumb": thumbnail, "poster": thumbnail})
         li.setInfo("video", {
             "title": title,
-            "plot": f"{channel}\n{date_str}",
+            "plot": plot,
             "duration": duration,
             "mediatype": "video",
         })
         li.setProperty("IsPlayable", "true")
 
-        url = build_plugin_url(BASE_URL, action="play", video_id=video_id)
-        xbmcplugin.addDirectoryItem(HANDLE, url, li, isFolder=False)
+        url = play_base + quote_param(video_id)
+        items.append((url, li, False))
 
     # Pagination
-    if offset + limit < total:
+    if next_page_url:
         li = xbmcgui.ListItem(label="[Next Page]")
-        url = build_plugin_url(BASE_URL, action="list_videos", feed_id=feed_id, offset=offset + limit)
-        xbmcplugin.addDirectoryItem(HANDLE, url, li, isFolder=True)
+        items.append((next_page_url, li, True))
 
+    xbmcplugin.addDirectoryItems(HANDLE, items, totalItems=len(items))
     xbmcplugin.endOfDirectory(HANDLE)
 
+    # Let the prefetch land on disk before the plugin process exits
+    if prefetch:
+        prefetch.join(PREFETCH_JOIN_TIMEOUT)
+
+
+def list_videos(feed_id: int, offset: int = 0):
+    """Show videos in a feed."""
+    settings = get_settings()
+    limit = settings["videos_per_page"]
+
+    try:
+        api = get_api()
+        result = api.get_feed_videos(feed_id, limit=limit, offset=offset, exclude_shorts=True)
+    except FeedsAPIError as e:
+        xbmcgui.Dialog().ok("Feeds", f"Error: {e}")
+        return
+
+    feed_name = result.get("name", "Videos")
+    videos = result.get("videos", [])
+    total = result.get("total", 0)
+
+    # Fetch the next page while this one renders
+    prefetch = None
+    next_page_url = None
+    if offset + limit < total:
+        prefetch = api.prefetch_feed_videos(feed_id, limit=limit, offset=offset + limit, exclude_shorts=True)
+        next_page_url = build_plugin_url(BASE_URL, action="list_videos", feed_id=feed_id, offset=offset + limit)
+
+    render_video_list(feed_name, videos, next_page_url, prefetch, skip_shorts=True, show_dates=True)
+
 
 def list_history(offset: int = 0):
     """Show watch history."""
@@ -150,36 +197,47 @@ def list_history(offset: int = 0):
     videos = result.get("videos", [])
     total = result.get("total", 0)
 
-    xbmcplugin.setPluginCategory(HANDLE, "History")
-    xbmcplugin.setContent(HANDLE, "videos")
+    # Fetch the next page while this one renders
+    prefetch = None
+    next_page_url = None
+    if offset + limit < total:
+        prefetch = api.prefetch_history(limit=limit, offset=offset + limit)
+        next_page_url = build_plugin_url(BASE_URL, action="history", offset=offset + limit)
 
-    for video in videos:
-        video_id = video.get("id")
-        title = video.get("title", "Unknown")
-        channel = video.get("channel_name", "")
-        thumbnail = video.get("thumbnail", "")
-        duration = video.get("duration", 0)
+    render_video_list("History", videos, next_page_url, prefetch)
 
-        li = xbmcgui.ListItem(label=title, label2=channel)
-        li.setArt({"thumb": thumbnail, "poster": thumbnail})
-        li.setInfo("video", {
-            "title": title,
-            "plot": channel,
-            "duration": duration,
-            "mediatype": "video",
-        })
-        li.setProperty("IsPlayable", "true")
 
-        url = build_plugin_url(BASE_URL, action="play", video_id=video_id)
-        xbmcplugin.addDirectoryItem(HANDLE, url, li, isFolder=False)
+def select_quality(api: FeedsAPI, video_id: str, default_quality: int):
+    """Pick a quality from the server's list, asking the user if configured.
 
-    # Pagination
-    if offset + limit < total:
-        li = xbmcgui.ListItem(label="[Next Page]")
-        url = build_plugin_url(BASE_URL, action="history", offset=offset + limit)
-        xbmcplugin.addDirectoryItem(HANDLE, url, li, isFolder=True)
+    Returns (quality, is_cached), or None if nothing is available or the
+    user cancelled.
+    """
+    # Get available qualities
+    qualities_data = api.get_video_qualities(video_id)
+    available = qualities_data.get("available") or []
+    cached = qualities_data.get("cached") or []
 
-    xbmcplugin.endOfDirectory(HANDLE)
+    if not available and not cached:
+        xbmcgui.Dialog().ok("Feeds", "No qualities available for this video.")
+        return None
+
+    cached_set = frozenset(str(c) for c in cached)
+    candidates = available or cached
+
+    if default_quality == 0:  # Ask each time
+        # Build options list, mark cached ones
+        options = [f"{q} (cached)" if str(q) in cached_set else str(q) for q in candidates]
+        choice = xbmcgui.Dialog().select("Select Quality", options)
+        if choice < 0:
+            return None
+        selected_quality = candidates[choice]
+    else:
+        # Nearest available height; "Best" (9999) resolves to the highest
+        heights = sorted((int(str(q).rstrip("p")), q) for q in candidates)
+        selected_quality = min(heights, key=lambda h: abs(h[0] - default_quality))[1]
+
+    return selected_quality, str(selected_quality) in cached_set
 
 
 def play_video(video_id: str):
@@ -191,75 +249,73 @@ def play_video(video_id: str):
     try:
         api = get_api()
 
-        # Get available qualities
-        qualities_data = api.get_video_qualities(video_id)
-        available = qualities_data.get("available") or []
-        cached = qualities_data.get("cached") or []
-
-        if not available and not cached:
-            xbmcgui.Dialog().ok("Feeds", "No qualities available for this video.")
-            return
+        # SponsorBlock segments don't depend on quality or download state,
+        # so fetch them in the background while we prepare the stream
+        # (daemon thread, so cancelling doesn't wait on it at exit). It gets its
+        # own client: without requests, calls on one client share a single
+        # connection and would queue behind each other.
+        segments_result = {}
+        segments_thread = None
+        if settings["sponsorblock_enabled"]:
+            segments_api = FeedsAPI(api.base_url)
+            segments_thread = threading.Thread(
+                target=lambda: segments_result.update(segments=segments_api.get_segments(video_id)),
+                daemon=True,
+            )
+            segments_thread.start()
 
         # Determine quality to use
         default_quality = settings["default_quality"]
-        selected_quality = None
-
-        if default_quality == 0:  # Ask each time
-            # Build options list, mark cached ones
-            options = []
-            quality_values = []
-            for q in available:
-                label = q
-                if q in cached:
-                    label += " (cached)"
-                options.append(label)
-                quality_values.append(q)
-
-            choice = xbmcgui.Dialog().select("Select Quality", options)
-            if choice < 0:
-                return
-            selected_quality = quality_values[choice]
-        elif default_quality == 9999:  # Best
-            selected_quality = available[-1] if available else cached[-1]
+        resolved = None
+        if default_quality != 0:
+            # Let the server pick the nearest quality in one round-trip
+            resolved = api.resolve_quality(video_id, default_quality)
+        if resolved:
+            selected_quality = resolved["selected"]
+            is_cached = resolved["cached"]
         else:
-            # Find matching quality or closest
-            target = str(default_quality)
-            if target in available:
-                selected_quality = target
-            elif target in cached:
-                selected_quality = target
-            else:
-                selected_quality = available[-1] if available else cached[-1]
-
-        # Check if already cached
-        is_cached = any(str(c) == str(selected_quality) for c in cached)
+            selection = select_quality(api, video_id, default_quality)
+            if selection is None:
+                return
+            selected_quality, is_cached = selection
+
         if not is_cached:
             # Need to download first
             pDialog = xbmcgui.DialogProgress()
             pDialog.create("Preparing Video", "Starting download...")
 
-            api.start_download(video_id, selected_quality)
-
-            # Poll for completion
-            import time
-            for i in range(120):  # Max 2 minutes
-                if pDialog.iscanceled():
-                    return
-                pDialog.update(int(i * 100 / 120), f"Downloading {selected_quality}...")
-                time.sleep(1)
-
-                # Check if now cached
-                new_qualities = api.get_video_qualities(video_id)
-                new_cached = new_qualities.get("cached") or []
-                if any(str(c) == str(selected_quality) for c in new_cached):
-                    break
-
-            pDialog.close()
+            try:
+                api.start_download(video_id, selected_quality)
+
+                # Wait for completion: long-poll the server, backing off between
+                # checks when it answers immediately (no wait endpoint)
+                monitor = xbmc.Monitor()
+                max_wait = 120  # Max 2 minutes
+                started = time.monotonic()
+                delay = 0.25
+                while True:
+                    if pDialog.iscanceled():
+                        return
+                    elapsed = time.monotonic() - started
+                    if elapsed >= max_wait:
+                        break
+                    pDialog.update(int(elapsed * 100 / max_wait), f"Downloading {selected_quality}...")
+
+                    polled_at = time.monotonic()
+                    if api.wait_for_download(video_id, selected_quality):
+                        break
+
+                    remaining = delay - (time.monotonic() - polled_at)
+                    if remaining > 0 and monitor.waitForAbort(remaining):
+                        return
+                    delay = min(delay * 2, 4)
+            finally:
+                pDialog.close()
 
         # Get SponsorBlock segments if enabled
-        segments = []
-        if settings["sponsorblock_enabled"]:
-            segments = api.get_segments(video_id)
+        if segments_thread:
+            segments_thread.join()
+        segments = segments_result.get("segments", [])
 
         # Play the video
         stream_url = api.get_stream_url(video_id, selected_quality)
@@ -1,64 +1,367 @@
 """Feeds Server API Client"""
 
+import hashlib
+import http.client
 import json
-import urllib.request
-import urllib.error
+import os
+import socket
+import ssl
+import threading
+import time
 import urllib.parse
-from typing import Optional
+from typing import Mapping, Optional, Tuple
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:  # fall back to the stdlib parser
+    def json_loads(data: bytes):
+        return json.loads(data)
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:  # script.module.requests not installed
+    requests = None
+
+# Prefetched pages kept on disk between plugin invocations
+PREFETCH_MAX_ENTRIES = 16
+PREFETCH_TTL = 300  # seconds
+
+# Redirect handling for the http.client fallback
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Responses kept for If-None-Match revalidation
+ETAG_MAX_ENTRIES = 64
 
 
 class FeedsAPIError(Exception):
     """Error from Feeds API"""
-    pass
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
 
 
 class FeedsAPI:
     """HTTP client for Feeds server API."""
 
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, cache_dir: Optional[str] = None, etag_dir: Optional[str] = None):
         self.base_url = base_url.rstrip("/")
+        self.cache_dir = cache_dir
+        self.etag_dir = etag_dir
+        self._supports_wait = True
+
+        # Reuse one keep-alive connection pool across calls
+        self._session = None
+        self._conn = None
+        self._conn_origin = None
+        self._conn_lock = threading.Lock()
+        self._ssl_ctx = None
+        if requests is None:
+            # Load the certificate store once; reconnects reuse the context
+            if self.base_url.startswith("https://"):
+                self._ssl_ctx = ssl.create_default_context()
+        else:
+            self._session = requests.Session()
+            self._session.headers["Content-Type"] = "application/json"
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+
+    def _cache_path(self, directory: str, path: str, ext: str) -> str:
+        """Get the on-disk cache file for a GET path."""
+        key = hashlib.sha1(f"{self.base_url}{path}".encode("utf-8")).hexdigest()
+        return os.path.join(directory, f"{key}.{ext}")
+
+    @staticmethod
+    def _store(directory: str, cache_file: str, data: bytes, max_entries: int) -> None:
+        """Atomically write a cache file and evict the oldest beyond the bound."""
+        try:
+            os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(data)
+            os.replace(tmp_file, cache_file)
+
+            ext = os.path.splitext(cache_file)[1]
+            entries = [
+                os.path.join(directory, name)
+                for name in os.listdir(directory)
+                if name.endswith(ext)
+            ]
+            entries.sort(key=os.path.getmtime)
+            for stale in entries[:-max_entries]:
+                os.remove(stale)
+        except OSError:
+            pass
+
+    def _cache_fresh(self, cache_file: str) -> bool:
+        """Check whether a prefetched file exists and is within the TTL."""
+        try:
+            return time.time() - os.path.getmtime(cache_file) <= PREFETCH_TTL
+        except OSError:
+            return False
+
+    def _read_cache(self, path: str) -> Optional[dict]:
+        """Consume a prefetched response, or None if missing or expired.
+
+        Entries are one-shot: they only cover the click onto the page they
+        were prefetched for, later loads go back to the server.
+        """
+        if not self.cache_dir:
+            return None
+        cache_file = self._cache_path(self.cache_dir, path, "json")
+        if not self._cache_fresh(cache_file):
+            return None
+        try:
+            with open(cache_file, "rb") as f:
+                data = f.read()
+            os.remove(cache_file)
+            return json_loads(data)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, path: str, result) -> None:
+        """Store a prefetched response."""
+        cache_file = self._cache_path(self.cache_dir, path, "json")
+        self._store(self.cache_dir, cache_file, json_dumps(result), PREFETCH_MAX_ENTRIES)
+
+    def _read_etag(self, path: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """Return the stored ETag and body for a GET path, if any."""
+        if not self.etag_dir:
+            return None, None
+        try:
+            with open(self._cache_path(self.etag_dir, path, "etag"), "rb") as f:
+                etag, _, body = f.read().partition(b"\n")
+            return etag.decode("utf-8"), body
+        except (OSError, UnicodeDecodeError):
+            return None, None
+
+    def _write_etag(self, path: str, etag: str, body: bytes) -> None:
+        """Store a response body under its ETag (one file: tag line, then body)."""
+        cache_file = self._cache_path(self.etag_dir, path, "etag")
+        self._store(self.etag_dir, cache_file, etag.encode("utf-8") + b"\n" + body, ETAG_MAX_ENTRIES)
+
+    def _fill_cache(self, path: str) -> None:
+        """Fetch a GET path into the cache unless a fresh copy exists."""
+        if self.cache_dir and self._cache_fresh(self._cache_path(self.cache_dir, path, "json")):
+            return
+        try:
+            self._write_cache(path, self._request("GET", path))
+        except FeedsAPIError:
+            pass
+
+    def _prefetch(self, path: str) -> Optional[threading.Thread]:
+        """Start filling the cache for a GET path in the background."""
+        if not self.cache_dir:
+            return None
+        thread = threading.Thread(target=self._fill_cache, args=(path,), daemon=True)
+        thread.start()
+        return thread
 
-    def _request(self, method: str, path: str, data: Optional[dict] = None) -> dict:
+    def _request(self, method: str, path: str, data: Optional[dict] = None, timeout: int = 30) -> dict:
         """Make HTTP request to API."""
-        url = f"{self.base_url}{path}"
-        headers = {"Content-Type": "application/json"}
+        headers = {}
+        etag_body = None
+        if method == "GET":
+            cached = self._read_cache(path)
+            if cached is not None:
+                return cached
+
+            # Revalidate a previously seen response instead of re-downloading it
+            etag, etag_body = self._read_etag(path)
+            if etag:
+                headers["If-None-Match"] = etag
+
+        body = json_dumps(data) if data else None
+        if self._session is not None:
+            status, payload, response_headers = self._send_session(method, path, body, headers, timeout)
+        else:
+            status, payload, response_headers = self._send_connection(method, path, body, headers, timeout)
+
+        if status == 304 and etag_body is not None:
+            payload = etag_body
+
+        if status >= 400:
+            message = f"HTTP Error {status}"
+            try:
+                error_data = json_loads(payload)
+                if isinstance(error_data, dict):
+                    message = error_data.get("error", message)
+            except ValueError:
+                pass
+            raise FeedsAPIError(message, status)
+
+        try:
+            result = json_loads(payload)
+        except ValueError:
+            # e.g. the SPA's index.html from a server without this API route
+            raise FeedsAPIError("Invalid response from server", status)
+        if status == 304:
+            return result
 
-        body = json.dumps(data).encode("utf-8") if data else None
-        req = urllib.request.Request(url, data=body, headers=headers, method=method)
+        etag = response_headers.get("ETag")
+        if method == "GET" and etag and self.etag_dir:
+            self._write_etag(path, etag, payload)
+        return result
 
+    def _send_session(self, method: str, path: str, body: Optional[bytes], headers: dict,
+                      timeout: int) -> Tuple[int, bytes, Mapping[str, str]]:
+        """Send a request through the pooled requests session."""
         try:
-            with urllib.request.urlopen(req, timeout=30) as response:
-                return json.loads(response.read().decode("utf-8"))
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode("utf-8")
+            response = self._session.request(
+                method, f"{self.base_url}{path}", data=body, headers=headers, timeout=timeout
+            )
+            return response.status_code, response.content, response.headers
+        except requests.RequestException as e:
+            raise FeedsAPIError(f"Cannot connect to server: {e}")
+
+    def _send_connection(self, method: str, path: str, body: Optional[bytes], headers: dict,
+                         timeout: int) -> Tuple[int, bytes, Mapping[str, str]]:
+        """Send a request over a shared http.client connection (no requests module).
+
+        Follows redirects like urllib did, reconnecting when the host changes.
+        """
+        url = f"{self.base_url}{path}"
+        headers = {"Content-Type": "application/json", **headers}
+
+        with self._conn_lock:
+            for _ in range(MAX_REDIRECTS + 1):
+                status, payload, response_headers = self._send_once(method, url, body, headers, timeout)
+                location = response_headers.get("Location")
+                if status not in REDIRECT_STATUSES or not location:
+                    return status, payload, response_headers
+
+                url = urllib.parse.urljoin(url, location)
+                if status in (301, 302, 303) and method != "GET":
+                    # As urllib: re-issue other methods as a bodiless GET
+                    method = "GET"
+                    body = None
+
+        raise FeedsAPIError("Too many redirects", status)
+
+    def _send_once(self, method: str, url: str, body: Optional[bytes], headers: dict,
+                   timeout: int) -> Tuple[int, bytes, Mapping[str, str]]:
+        """Send one request on the shared connection (caller holds _conn_lock)."""
+        parts = urllib.parse.urlsplit(url)
+        target = f"{parts.path or '/'}?{parts.query}" if parts.query else (parts.path or "/")
+
+        # Retry once: the server may have closed an idle keep-alive connection
+        for attempt in range(2):
+            if self._conn is not None and self._conn_origin != (parts.scheme, parts.netloc):
+                self._conn.close()
+                self._conn = None
+            if self._conn is None:
+                if parts.scheme == "https":
+                    if self._ssl_ctx is None:
+                        self._ssl_ctx = ssl.create_default_context()
+                    self._conn = http.client.HTTPSConnection(parts.netloc, timeout=timeout, context=self._ssl_ctx)
+                else:
+                    self._conn = http.client.HTTPConnection(parts.netloc, timeout=timeout)
+                self._conn_origin = (parts.scheme, parts.netloc)
+            conn = self._conn
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+
             try:
-                error_data = json.loads(error_body)
-                raise FeedsAPIError(error_data.get("error", str(e)))
-            except json.JSONDecodeError:
-                raise FeedsAPIError(str(e))
-        except urllib.error.URLError as e:
-            raise FeedsAPIError(f"Cannot connect to server: {e.reason}")
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+                return response.status, response.read(), response.headers
+            except socket.timeout as e:
+                conn.close()
+                self._conn = None
+                raise FeedsAPIError(f"Cannot connect to server: {e}")
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._conn = None
+                if attempt:
+                    raise FeedsAPIError(f"Cannot connect to server: {e}")
 
     def get_feeds(self) -> list:
         """Get all feeds."""
         return self._request("GET", "/api/feeds")
 
-    def get_feed_videos(self, feed_id: int, limit: int = 50, offset: int = 0) -> dict:
+    @staticmethod
+    def _feed_videos_path(feed_id: int, limit: int, offset: int, exclude_shorts: bool) -> str:
+        """Build the feed page path shared by fetch and prefetch."""
+        path = f"/api/feeds/{feed_id}?limit={limit}&offset={offset}"
+        if exclude_shorts:
+            path += "&exclude_shorts=true"
+        return path
+
+    def get_feed_videos(self, feed_id: int, limit: int = 50, offset: int = 0,
+                        exclude_shorts: bool = False) -> dict:
         """Get videos in a feed with pagination."""
-        return self._request("GET", f"/api/feeds/{feed_id}?limit={limit}&offset={offset}")
+        return self._request("GET", self._feed_videos_path(feed_id, limit, offset, exclude_shorts))
+
+    def prefetch_feed_videos(self, feed_id: int, limit: int = 50, offset: int = 0,
+                             exclude_shorts: bool = False) -> Optional[threading.Thread]:
+        """Fetch a page of feed videos in the background for a later call."""
+        return self._prefetch(self._feed_videos_path(feed_id, limit, offset, exclude_shorts))
 
     def get_history(self, limit: int = 50, offset: int = 0) -> dict:
         """Get watch history."""
         return self._request("GET", f"/api/videos/history?limit={limit}&offset={offset}")
 
+    def prefetch_history(self, limit: int = 50, offset: int = 0) -> Optional[threading.Thread]:
+        """Fetch a page of watch history in the background for a later call."""
+        return self._prefetch(f"/api/videos/history?limit={limit}&offset={offset}")
+
     def get_video_qualities(self, video_id: str) -> dict:
         """Get available qualities for a video."""
         return self._request("GET", f"/api/videos/{video_id}/qualities")
 
+    def resolve_quality(self, video_id: str, preferred: int) -> Optional[dict]:
+        """Resolve the nearest available quality and whether it is cached.
+
+        Returns {"selected": str, "cached": bool}, or None if the server
+        doesn't support quality resolution.
+        """
+        try:
+            return self._request("POST", f"/api/videos/{video_id}/resolve-quality", {
+                "preferred": str(preferred)
+            })
+        except FeedsAPIError as e:
+            if e.status in (404, 405, 501):
+                return None
+            raise
+
     def start_download(self, video_id: str, quality: str) -> dict:
         """Start server-side download of video."""
         return self._request("POST", f"/api/videos/{video_id}/download", {"quality": quality})
 
+    def wait_for_download(self, video_id: str, quality: str, timeout: int = 5) -> bool:
+        """Wait up to timeout seconds for a quality to be cached.
+
+        Long-polls the server; servers without the wait endpoint get a single
+        qualities check instead. Returns True once the quality is cached.
+        """
+        if self._supports_wait:
+            try:
+                result = self._request(
+                    "GET",
+                    f"/api/videos/{video_id}/download/wait?quality={quality}&timeout={timeout}",
+                    timeout=timeout + 10,
+                )
+                return bool(result.get("cached"))
+            except FeedsAPIError as e:
+                # Older servers answer the unknown route with 404 or, via the
+                # SPA catch-all, a 2xx non-JSON page
+                if e.status is None or (e.status >= 300 and e.status != 404):
+                    raise
+                self._supports_wait = False
+
+        cached = self.get_video_qualities(video_id).get("cached") or []
+        return any(str(c) == str(quality) for c in cached)
+
     def get_stream_url(self, video_id: str, quality: str = None) -> str:
         """Get stream URL for a video."""
         if quality:
@@ -1,8 +1,15 @@
 """Playback monitor for progress sync and SponsorBlock."""
 
+import bisect
+import queue
+import threading
+
 import xbmc
 import xbmcgui
 
+# Longest onPlayBackStopped waits for the final progress report
+FLUSH_TIMEOUT = 10  # seconds
+
 
 class FeedsPlayer(xbmc.Player):
     """Custom player with progress tracking and SponsorBlock support."""
@@ -18,6 +25,30 @@ class FeedsPlayer(xbmc.Player):
         self.playing = False
         self.marked_watched = False
         self.monitor = xbmc.Monitor()
+        self._starts, self._ends = self._build_segment_index(segments)
+
+        # Progress reports are sent from a worker so a slow server can't
+        # stall the monitor loop (and SponsorBlock skips with it)
+        self._report_q = queue.Queue(maxsize=8)
+        threading.Thread(target=self._report_worker, daemon=True).start()
+
+    @staticmethod
+    def _build_segment_index(segments: list) -> tuple:
+        """Sort and merge segments into parallel start/end lists for bisect."""
+        starts = []
+        ends = []
+        for seg in sorted(segments, key=lambda s: s.get("start_time", 0)):
+            start = seg.get("start_time", 0)
+            end = seg.get("end_time", 0)
+            if end <= start:
+                continue
+            if ends and start <= ends[-1]:
+                # Overlapping or adjacent: extend the previous segment
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        return starts, ends
 
     def onAVStarted(self):
         """Called when playback actually starts."""
@@ -31,7 +62,7 @@ class FeedsPlayer(xbmc.Player):
     def onPlayBackStopped(self):
         """Called when playback is stopped."""
         self.playing = False
-        self._report_progress()
+        self._report_progress(flush=True)
 
     def onPlayBackPaused(self):
         """Called when playback is paused."""
@@ -40,21 +71,63 @@ class FeedsPlayer(xbmc.Player):
     def onPlayBackEnded(self):
         """Called when playback ends naturally."""
         self.playing = False
-        # Mark as watched if we reached near the end
+        # Mark as watched if we reached near the end (unless already done)
         try:
-            if self.duration > 0:
+            if not self.marked_watched and self.duration > 0:
                 self.api.mark_watched(self.video_id)
+                self.marked_watched = True
         except Exception:
             pass
 
-    def _report_progress(self):
-        """Report current progress to server."""
+    def _report_worker(self):
+        """Send queued progress reports to the server."""
+        while True:
+            position, duration, sent = self._report_q.get()
+            try:
+                self.api.report_progress(self.video_id, position, duration)
+            except Exception:
+                pass
+            finally:
+                if sent is not None:
+                    sent.set()
+
+    def _report_progress(self, flush: bool = False):
+        """Queue current progress for the server, optionally waiting until sent."""
         try:
             position = int(self.getTime())
-            if self.duration > 0:
-                self.api.report_progress(self.video_id, position, self.duration)
         except Exception:
-            pass
+            return
+        if self.duration <= 0:
+            return
+
+        sent = None
+        if flush:
+            # Final report: discard older pending ones so it is next in line
+            sent = threading.Event()
+            while True:
+                try:
+                    self._report_q.get_nowait()
+                except queue.Empty:
+                    break
+
+        report = (position, self.duration, sent)
+        try:
+            self._report_q.put_nowait(report)
+        except queue.Full:
+            # Drop the oldest report; only the latest position matters
+            try:
+                self._report_q.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._report_q.put_nowait(report)
+            except queue.Full:
+                pass
+
+        if sent is not None:
+            # Give it a chance to go out before the plugin exits, but don't
+            # hold up Kodi if the server has stalled
+            sent.wait(FLUSH_TIMEOUT)
 
     def _start_monitor(self):
         """Start the playback monitoring loop."""
@@ -66,20 +139,17 @@ class FeedsPlayer(xbmc.Player):
                 current_time = int(position)
 
                 # SponsorBlock: check if in sponsor segment
-                if self.sponsorblock_enabled and self.segments:
-                    for seg in self.segments:
-                        start = seg.get("start_time", 0)
-                        end = seg.get("end_time", 0)
-                        if start <= position < end:
-                            # Skip to end of segment
-                            self.seekTime(end)
-                            xbmcgui.Dialog().notification(
-                                "SponsorBlock",
-                                "Skipped sponsor",
-                                xbmcgui.NOTIFICATION_INFO,
-                                2000
-                            )
-                            break
+                if self.sponsorblock_enabled and self._starts:
+                    i = bisect.bisect_right(self._starts, position) - 1
+                    if i >= 0 and position < self._ends[i]:
+                        # Skip to end of segment
+                        self.seekTime(self._ends[i])
+                        xbmcgui.Dialog().notification(
+                            "SponsorBlock",
+                            "Skipped sponsor",
+                            xbmcgui.NOTIFICATION_INFO,
+                            2000
+                        )
 
                 # Progress reporting every 30 seconds
                 if current_time - self.last_progress_report >= report_interval:
@@ -87,7 +157,7 @@ class FeedsPlayer(xbmc.Player):
                     self.last_progress_report = current_time
 
                 # Check if 90% complete -> mark as watched
-                if self.duration > 0 and position > self.duration * 0.9 and not self.marked_watched:
+                if not self.marked_watched and self.duration > 0 and position > self.duration * 0.9:
                     try:
                         self.api.mark_watched(self.video_id)
                         self.marked_watched = True
@@ -98,4 +168,6 @@ class FeedsPlayer(xbmc.Player):
                 # Player no longer active
                 break
 
-            xbmc.sleep(1000)  # Check every second
+            # Check every second, waking immediately on Kodi shutdown
+            if self.monitor.waitForAbort(1):
+                break
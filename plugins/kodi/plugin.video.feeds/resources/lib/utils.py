@@ -1,8 +1,13 @@
 """Utility functions for Feeds Kodi Plugin"""
 
+import functools
+import urllib.parse
 from datetime import datetime, timezone
 from typing import Optional
 
+# Length of the server's usual timestamp shape, "YYYY-MM-DDTHH:MM:SSZ"
+_ISO_UTC_LEN = 20
+
 
 def format_duration(seconds: Optional[int]) -> str:
     """Format duration in seconds to HH:MM:SS or MM:SS."""
@@ -15,16 +20,27 @@ def format_duration(seconds: Optional[int]) -> str:
     return f"{minutes}:{secs:02d}"
 
 
+@functools.lru_cache(maxsize=512)
+def _parse_iso(iso_date: str) -> datetime:
+    """Parse an ISO date string to an aware datetime (UTC if no offset)."""
+    # Slice the common "YYYY-MM-DDTHH:MM:SSZ" shape directly
+    if len(iso_date) == _ISO_UTC_LEN and iso_date[-1] == "Z" and iso_date[4] == "-" and iso_date[10] == "T":
+        return datetime(
+            int(iso_date[0:4]), int(iso_date[5:7]), int(iso_date[8:10]),
+            int(iso_date[11:13]), int(iso_date[14:16]), int(iso_date[17:19]),
+            tzinfo=timezone.utc,
+        )
+    if "Z" in iso_date:
+        return datetime.fromisoformat(iso_date.replace("Z", "+00:00"))
+    if "+" in iso_date or iso_date.endswith("-00:00"):
+        return datetime.fromisoformat(iso_date)
+    return datetime.fromisoformat(iso_date).replace(tzinfo=timezone.utc)
+
+
 def format_relative_date(iso_date: str) -> str:
     """Format ISO date string to relative time (e.g., '3 days ago')."""
     try:
-        # Parse ISO format
-        if "Z" in iso_date:
-            dt = datetime.fromisoformat(iso_date.replace("Z", "+00:00"))
-        elif "+" in iso_date or iso_date.endswith("-00:00"):
-            dt = datetime.fromisoformat(iso_date)
-        else:
-            dt = datetime.fromisoformat(iso_date).replace(tzinfo=timezone.utc)
+        dt = _parse_iso(iso_date)
 
         now = datetime.now(timezone.utc)
         diff = now - dt
@@ -57,7 +73,16 @@ def format_relative_date(iso_date: str) -> str:
 
 def build_plugin_url(base_url: str, **params) -> str:
     """Build a plugin:// URL with parameters."""
-    import urllib.parse
     if params:
         return f"{base_url}?{urllib.parse.urlencode(params)}"
     return base_url
+
+
+def build_play_url_prefix(base_url: str) -> str:
+    """Build the play URL up to the video ID, for appending in list loops."""
+    return build_plugin_url(base_url, action="play", video_id="")
+
+
+def quote_param(value) -> str:
+    """Quote a single URL parameter value."""
+    return urllib.parse.quote_plus(str(value), safe="")